@@ -1,8 +1,22 @@
-from .auth import login, logout
-from .chat import start_chat
+import importlib
+
 from .configs import Config
-from .client import cleanup
 
 __all__ = ["login", "logout", "start_chat", "Config", "cleanup"]
 
 __version__ = "1.4.1"
+
+# The rest is loaded on first access, so that importing the package (e.g. for
+# the CLI's --help) does not pull in instagrapi and the chat UI
+_LAZY_EXPORTS = {
+    "login": ".auth",
+    "logout": ".auth",
+    "start_chat": ".chat",
+    "cleanup": ".client",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_EXPORTS:
+        return getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
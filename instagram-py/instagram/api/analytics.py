@@ -1,12 +1,11 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # import re
 from instagram.client import ClientWrapper
 from instagram.api.direct_messages import DirectMessages
 import curses
 import math
-import time
-from collections import Counter
+from functools import lru_cache
 
 from instagram.utils.loading import with_loading_screen
 from instagram.utils.notification_utils import (
@@ -15,10 +14,18 @@ from instagram.utils.notification_utils import (
 )
 
 
+@lru_cache(maxsize=1)
+def _session_client() -> ClientWrapper:
+    """ClientWrapper logged in from the saved session, shared by the analytics commands."""
+    client = ClientWrapper()
+    client.login_by_session()
+    return client
+
+
 def fetch_updates() -> dict:
     """Fetches latest updates from Instagram and returns them."""
-    client = ClientWrapper()
-    cl = client.login_by_session()
+    client = _session_client()
+    cl = client.insta_client
     dm = DirectMessages(client)
     # Get latest updates
     data = cl.news_inbox_v1()
@@ -238,7 +245,7 @@ class CursesBarGraph:
     def __exit__(self, exc_type, exc_value, traceback):
         curses.endwin()
 
-    def Update(self, values, hold=False):
+    def Update(self, values, hold=False, wait_ms=0):
         assert self._window
         h, w = self._window.getmaxyx()
         self._max = max(1, max(values))
@@ -263,8 +270,9 @@ class CursesBarGraph:
                 ch = self._window.getch()
             raise KeyboardInterrupt
 
-        # Allow quitting by pressing 'q'
-        self._window.nodelay(True)
+        # Allow quitting by pressing 'q', waiting up to wait_ms for the key
+        # so callers can pace the animation without a separate sleep
+        self._window.timeout(wait_ms)
         ch = self._window.getch()
         if ch == ord("q"):
             raise KeyboardInterrupt
@@ -283,39 +291,31 @@ class CursesBarGraph:
 
     @staticmethod
     def _AveragedChunks(iterable, n):
-        summed_v = 0
-        summed_count = 0
-        for v in iterable:
-            summed_v += v
-            summed_count += 1
-            if summed_count >= n:
-                yield float(summed_v) / summed_count
-                summed_v = 0
-                summed_count = 0
-        if summed_count > 0:
-            yield float(summed_v) / summed_count
+        values = list(iterable)
+        for start in range(0, len(values), n):
+            chunk = values[start : start + n]
+            yield float(sum(chunk)) / len(chunk)
 
 
 def get_brainrot_history(last_n_days):
     """Fetches liked Reels data and returns a list of counts per day."""
-    cl = ClientWrapper().login_by_session()
+    cl = _session_client().insta_client
     data = cl.liked_medias(amount=30)
 
     if not data:
         return [0] * last_n_days
 
     first_date = data[0].taken_at.date()
-    last_week = []
+    # Index 0 is first_date, counting back one day per index
+    reels_per_day = [0] * last_n_days
 
     for media in data:
         if media.media_type == 2:
-            media_date = media.taken_at.date()
-            if 0 <= (first_date - media_date).days < last_n_days:
-                last_week.append(media_date)
+            days_ago = (first_date - media.taken_at.date()).days
+            if 0 <= days_ago < last_n_days:
+                reels_per_day[days_ago] += 1
 
-    days = [first_date - timedelta(days=i) for i in range(last_n_days)]
-    reels_per_day = Counter(last_week)
-    return [reels_per_day.get(day, 0) for day in days][::-1]
+    return reels_per_day[::-1]
 
 
 def analytics_bar_graph(last_n_days=7):
@@ -332,8 +332,8 @@ def analytics_bar_graph(last_n_days=7):
                 if i >= last_n_days - 1:
                     bar_graph.Update(current_values, hold=True)
                 else:
-                    bar_graph.Update(current_values)
-                time.sleep(0.2)  # Add delay for animation effect
+                    # Delay for animation effect, returns early on 'q'
+                    bar_graph.Update(current_values, wait_ms=200)
 
         except KeyboardInterrupt:
             return
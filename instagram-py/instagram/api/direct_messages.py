@@ -1,12 +1,19 @@
 from __future__ import annotations
-from typing import Dict, List, Tuple, Protocol
+from typing import Dict, List, Set, Tuple, Protocol
 from pathlib import Path
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+import hashlib
+import json
+import logging
+import re
+import threading
 import webbrowser
 import emoji
 
 from .utils import (
     direct_threads_chunk,
-    user_info_by_username_private,
     direct_thread_chunk,
     fuzzy_match,
     direct_send_media,
@@ -25,7 +32,6 @@ from instagrapi.types import (
 )
 from instagrapi.extractors import extract_direct_thread, extract_direct_media
 from instagrapi.exceptions import (
-    UserNotFound,
     DirectThreadNotFound,
     ClientForbiddenError,
 )
@@ -33,17 +39,116 @@ from pydantic import ValidationError
 from dataclasses import dataclass
 from typing import Optional
 from instagram.configs import Config
+from instagram.cache import CacheManager
 
 # logger = setup_logging(__name__)
 
+# A whitespace-delimited word that starts and ends with ":", e.g. :thumbsup:
+_EMOJI_TOKEN_RE = re.compile(r"(?:^|\s):\S*:(?=\s|$)")
+
+# Message item types rendered as text by DirectChat.get_chat_history
+_TEXT_ITEM_TYPES = frozenset({"text", "link", "xma_link"})
+
+# Placeholder text for media messages in the chat history
+_PLACEHOLDER_TEMPLATES = {
+    # Format: 'media_type': 'placeholder text'
+    "view_once": "[Sent a view-once media (use the Instagram app to view it)]",
+    "xma_media_share": "[Shared a post (use the Instagram app to view it)]",
+    "image": "[Sent an image #{index}]",
+    "video": "[Sent a video #{index}]",
+    "audio": "[Sent an audio #{index}]",
+    "media": "[Sent a {media_type} #{index}]",
+    "voice_media": "[Sent a {media_type} #{index}]",
+    "clip": "[Sent brainrot]",
+    "animated_media": "[Sent a sticker #{index}]",
+    "reply": "[Replied to your note/post: {reply_text}]",
+}
+
+# Most chat titles kept in the persisted title cache, least recently changed go first
+_MAX_STORED_TITLES = 1000
+
+# Media URL attributes in order of preference and the media type each implies
+_MEDIA_URL_KINDS = (
+    ("video_url", "video"),
+    ("thumbnail_url", "image"),
+    ("audio_url", "audio"),
+)
+
+
+def _classify_media(media) -> Dict[str, str]:
+    """
+    Media item fields for the first URL set on a DirectMedia,
+    i.e. {"url": ..., "media_type": ...}, or an empty dict if it has none.
+    """
+    for attr, media_type in _MEDIA_URL_KINDS:
+        if url := getattr(media, attr, None):
+            return {"url": url, "media_type": media_type}
+    return {}
+
+
+@lru_cache(maxsize=None)
+def _ensure_dir(path: str) -> Path:
+    """Create a directory on first use and return it, later calls skip the mkdir."""
+    directory = Path(path)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def _media_dir() -> Path:
+    """Directory for downloaded media, keyed on the current config value."""
+    return _ensure_dir(Config().get("advanced.media_dir"))
+
+
+def _generated_dir() -> Path:
+    """Directory for generated files (e.g. LaTeX renders)."""
+    return _ensure_dir(Config().get("advanced.generated_dir"))
+
+
+@lru_cache(maxsize=None)
+def _emoji_name_index() -> Tuple[frozenset[str], Tuple[str, ...]]:
+    """
+    Build the set of emoji names used by DirectChat._replace_emojis once.
+    Returns the names both as a set (membership) and a tuple (fuzzy matching).
+    """
+    emoji_names = set()
+    # take all the english and english aliases
+    for emo in emoji.EMOJI_DATA.values():
+        if "alias" in emo:
+            if isinstance(emo["alias"], list):
+                for alias in emo["alias"]:
+                    emoji_names.add(alias)
+        else:
+            emoji_names.add(emo["en"])
+    return frozenset(emoji_names), tuple(emoji_names)
+
+
+def _run_in_background(func, *args, **kwargs) -> Future:
+    """Run func in a daemon thread, the returned future holds its result."""
+    future: Future = Future()
+
+    def run():
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
 
-@dataclass
+def _trigrams(text: str) -> set[str]:
+    """Lowercased character trigrams of text, used to index chat titles."""
+    text = text.lower()
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+@dataclass(slots=True)
 class MessageBrief:
     sender: str
     content: str
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageInfo:
     id: str
     message: MessageBrief
@@ -60,6 +165,75 @@ class DirectMessages:
         self.client = client
         self.chats: List[DirectChat] = []
         self.chats_cursor = None
+        # trigram -> thread ids whose title contains it, see search_by_title
+        self._title_index: Dict[str, set[str]] = {}
+        self._chats_by_id: Dict[str, DirectChat] = {}
+        # lowercased exact keys of loaded chats, checked before fuzzy matching
+        self._chats_by_title: Dict[str, DirectChat] = {}
+        self._chats_by_username: Dict[str, DirectChat] = {}
+        # thread id -> title of chats seen in any session, see search_by_title
+        self._title_cache: Dict[str, str] | None = None
+        # (num_chats, num_message_limit, future) of a background chunk fetch
+        self._prefetch: Tuple[int, int, Future] | None = None
+        # Users looked up by username, persisted across sessions, see _user_cache
+        self._users: CacheManager | None = None
+
+    def _index_chats(self, chats: List[DirectChat]) -> None:
+        """Add chats to the title and username indexes used by the searches."""
+        for chat in chats:
+            self._chats_by_id[chat.thread_id] = chat
+            # Keep the most recent chat for duplicate titles, like a fuzzy match would
+            self._chats_by_title.setdefault(chat.title.lower(), chat)
+            users = chat.thread.users
+            if not chat.thread.is_group and len(users) == 1:
+                self._chats_by_username.setdefault(users[0].username.lower(), chat)
+            for gram in _trigrams(chat.title):
+                self._title_index.setdefault(gram, set()).add(chat.thread_id)
+        self._store_titles(chats)
+
+    def _title_cache_path(self) -> Path:
+        """Per-user file that persists chat titles across sessions."""
+        cache_dir = _ensure_dir(Config().get("advanced.cache_dir"))
+        return cache_dir / f"{self.client.insta_client.username}_thread_titles.json"
+
+    def _load_title_cache(self) -> Dict[str, str]:
+        """Load the persisted chat titles on first use."""
+        if self._title_cache is None:
+            try:
+                with open(self._title_cache_path(), "r", encoding="utf-8") as f:
+                    self._title_cache = json.load(f)
+            except (OSError, ValueError):
+                self._title_cache = {}
+        return self._title_cache
+
+    def _store_titles(self, chats: List[DirectChat]) -> None:
+        """Upsert chat titles into the persisted title cache, writing only on change."""
+        if not chats:
+            return
+        cache = self._load_title_cache()
+        changed = False
+        for chat in chats:
+            if cache.get(chat.thread_id) != chat.title:
+                # Move the entry to the end so pruning drops the stalest first
+                cache.pop(chat.thread_id, None)
+                cache[chat.thread_id] = chat.title
+                changed = True
+        if not changed:
+            return
+        while len(cache) > _MAX_STORED_TITLES:
+            del cache[next(iter(cache))]
+        try:
+            with open(self._title_cache_path(), "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False, separators=(",", ":"))
+        except OSError:
+            pass  # the cache is only an optimization
+
+    def _user_cache(self) -> CacheManager:
+        """Load the persisted user cache on first use."""
+        if self._users is None:
+            self._users = CacheManager(self.client)
+            self._users.load_cache()
+        return self._users
 
     def fetch_chat_data(
         self, num_chats: int, num_message_limit: int
@@ -72,12 +246,18 @@ class DirectMessages:
 
         Returns a list of DirectChat objects.
         """
+        self._prefetch = None  # fetched from a cursor we are about to reset
         res, self.chats_cursor = direct_threads_chunk(
             self.client.insta_client,
             amount=num_chats,
             thread_message_limit=num_message_limit,
         )
         self.chats = [DirectChat(self.client, thread.id, thread) for thread in res]
+        self._title_index.clear()
+        self._chats_by_id.clear()
+        self._chats_by_title.clear()
+        self._chats_by_username.clear()
+        self._index_chats(self.chats)
         return self.chats
 
     def fetch_next_chat_chunk(
@@ -91,16 +271,46 @@ class DirectMessages:
 
         Returns a list of DirectChat objects.
         """
-        res, self.chats_cursor = direct_threads_chunk(
-            self.client.insta_client,
-            amount=num_chats,
-            thread_message_limit=num_message_limit,
-            cursor=self.chats_cursor,
-        )
+        prefetch, self._prefetch = self._prefetch, None
+        if prefetch is not None and prefetch[:2] == (num_chats, num_message_limit):
+            res, self.chats_cursor = prefetch[2].result()
+        else:
+            res, self.chats_cursor = direct_threads_chunk(
+                self.client.insta_client,
+                amount=num_chats,
+                thread_message_limit=num_message_limit,
+                cursor=self.chats_cursor,
+            )
         # Append to existing chats (maintain reverse chronological order)
-        self.chats += [DirectChat(self.client, thread.id, thread) for thread in res]
+        # in place, the chat menu holds a reference to this same list
+        new_chats = [DirectChat(self.client, thread.id, thread) for thread in res]
+        self.chats.extend(new_chats)
+        self._index_chats(new_chats)
         return self.chats
 
+    def prefetch_next_chat_chunk(self, num_chats: int, num_message_limit: int):
+        """
+        Start fetching the next chunk of chats in the background so that a
+        following fetch_next_chat_chunk with the same arguments returns
+        without waiting on the network. Does nothing if one is in flight.
+        Parameters:
+        - num_chats: Number of chats to fetch.
+        - num_message_limit: Max number of messages to fetch per chat.
+        """
+        if self._prefetch is not None:
+            return
+        self._prefetch = (
+            num_chats,
+            num_message_limit,
+            _run_in_background(
+                direct_threads_chunk,
+                self.client.insta_client,
+                amount=num_chats,
+                thread_message_limit=num_message_limit,
+                cursor=self.chats_cursor,
+            ),
+        )
+
     def search_by_username(self, username: str) -> DirectChat | None:
         """
         Search for a chat by username, the workflow:
@@ -116,16 +326,33 @@ class DirectMessages:
         NOTE: This requires an EXACT MATCH of usernames,
         we recommend using search_by_title for fuzzy matching
         """
+        # A loaded 1:1 chat already carries the participant's username,
+        # so it can be returned without any lookup requests
+        if chat := self._chats_by_username.get(username.lower()):
+            return chat
+
         # TODO: compare which of the following two methods is faster
         # user = self.client.insta_client.direct_search(username) # Returns a list of search results
         # user_id = user[0].pk # This gets the user_id of the first search result
-        user_id = None
-        try:
-            user_id = user_info_by_username_private(
-                self.client.insta_client, username
-            ).pk
-        except UserNotFound:
+
+        # Disable all other loggers (dependencies) so no http errors would be printed to console
+        logging.getLogger().setLevel(logging.CRITICAL)
+
+        # Usernames looked up in earlier sessions need no request at all,
+        # others only go through the (faster) private API
+        users = self._user_cache()
+        cached = username.lower() in users.username_user_cache
+        user = users.get_user_from_username(
+            username, CacheManager.CACHE | CacheManager.PRIVATE_API
+        )
+        if user is None:
             return None
+        if not cached:
+            try:
+                users.dump_cache()
+            except OSError:
+                pass  # the cache is only an optimization
+        user_id = user.pk
 
         try:
             thread_data = self.client.insta_client.direct_thread_by_participants(
@@ -163,39 +390,74 @@ class DirectMessages:
         """
 
         batch_size = 20
-        num_chats_searched = 0
         max_search_depth = 50
 
-        # Check existing chats first
-        if len(self.chats) > 0:
-            num_chats_searched = len(self.chats)
+        def match(chats: List[DirectChat]) -> DirectChat | None:
             result = fuzzy_match(
                 query=title,
-                items=self.chats,
-                getter=lambda chat: chat.get_title(),
+                items=chats,
+                getter=lambda chat: chat.title,
                 cutoff=threshold,
                 use_partial_ratio=True,
             )
-            if len(result) > 0:
-                return result[0]
-
+            return result[0] if result else None
+
+        # An exact (case-insensitive) title needs no fuzzy matching at all
+        if chat := self._chats_by_title.get(title.lower()):
+            return chat
+
+        # Check existing chats first, starting with those sharing a trigram
+        # with the query so a hit usually needs only a few comparisons
+        hits: Set[str] = set()
+        for gram in _trigrams(title):
+            hits.update(self._title_index.get(gram, ()))
+        if hits:
+            # Keep inbox order so equally good matches resolve the same way
+            # as a plain scan of self.chats would
+            found = match([chat for chat in self.chats if chat.thread_id in hits])
+            if found is not None:
+                return found
+        found = match([chat for chat in self.chats if chat.thread_id not in hits])
+        if found is not None:
+            return found
+
+        # Then chats seen in earlier sessions, so that only the matched thread
+        # is fetched instead of paging through the whole inbox
+        cached = [
+            (thread_id, cached_title)
+            for thread_id, cached_title in self._load_title_cache().items()
+            if thread_id not in self._chats_by_id
+        ]
+        result = fuzzy_match(
+            query=title,
+            items=cached,
+            getter=lambda item: item[1],
+            cutoff=threshold,
+            use_partial_ratio=True,
+        )
+        if result:
+            try:
+                chat = DirectChat(self.client, result[0][0])
+                # Fetches the thread, the cached title may be stale
+                self._store_titles([chat])
+            except Exception:
+                chat = None  # thread deleted or no longer accessible
+            if chat is not None and match([chat]) is not None:
+                return chat
+
+        num_chats_searched = len(self.chats)
         while num_chats_searched < max_search_depth:
             self.fetch_next_chat_chunk(batch_size, 20)
-            num_chats_searched += batch_size
-
-            result = fuzzy_match(
-                query=title,
-                items=self.chats[num_chats_searched - batch_size : num_chats_searched],
-                getter=lambda chat: chat.get_title(),
-                cutoff=threshold,
-                use_partial_ratio=True,
-            )
-
-            if result is None:
-                continue
-
-            if len(result) > 0:
-                return result[0]
+            if len(self.chats) < max_search_depth:
+                # Fetch the following page while this one is being matched,
+                # if we return early it is kept for the next scroll
+                self.prefetch_next_chat_chunk(batch_size, 20)
+            found = match(self.chats[num_chats_searched:])
+            if found is not None:
+                return found
+            if len(self.chats) == num_chats_searched:
+                break  # no more chats to page through
+            num_chats_searched = len(self.chats)
 
         raise DirectThreadNotFound(
             f"Chat with title {title} not found in the latest {num_chats_searched} chats"
@@ -209,28 +471,73 @@ class DirectMessages:
 
 
 class DirectChat:
+    # Many chats are kept alive in DirectMessages.chats, skip the per-instance dict
+    __slots__ = (
+        "client",
+        "thread_id",
+        "media_items",
+        "_thread",
+        "messages_cursor",
+        "_msg_by_id",
+        "_title",
+        "_seen",
+        "_users_cache",
+        "_sender_names",
+    )
+
     def __init__(self, client: ClientWrapper, thread_id: str, thread_data=None):
         self.client = client
         self.thread_id = thread_id
         self.media_items = {}
-        if thread_data is None:
-            self.thread = self.client.insta_client.direct_thread(thread_id)
-        else:
-            self.thread = thread_data
+        # If no thread data is given it is only fetched on first access,
+        # the same goes for everything derived from it below
+        self._thread = thread_data
 
         self.messages_cursor = None
-        self.title = self.get_title()
-
-        # We need to fetch thread first then check seen status
+        # message id -> message, built on the first search_message_by_id call
+        self._msg_by_id: Dict[str, DirectMessage] | None = None
+        self._title: str | None = None
+        self._seen: int | None = None
+        self._users_cache: Dict[str, UserShort] | None = None
+        # Display name per user id, looked up for every message in the history
+        self._sender_names: Dict[str, str] | None = None
+
+    @property
+    def thread(self):
+        """The DirectThread, fetched on first access if not given."""
+        if self._thread is None:
+            self._thread = self.client.insta_client.direct_thread(self.thread_id)
+        return self._thread
+
+    @property
+    def title(self) -> str:
+        """Chat title, see get_title."""
+        if self._title is None:
+            self._title = self.get_title()
+        return self._title
+
+    @property
+    def seen(self) -> int:
+        """Read state of the chat, 0 if seen, 1 if unseen."""
         # NOTE: This is very poorly documented, but through experimentation,
         # we found that meta returns 1 for unseen and 0 for seen for read_state
         # Note that this is returned directly by Meta, but often disagrees with
         # the builtin is_seen() function??
-        self.seen = self.thread.read_state  # 0 if seen, 1 if unseen
-
-        self.users_cache: Dict[str, UserShort] = {
-            user.pk: user for user in self.thread.users
-        }
+        if self._seen is None:
+            self._seen = self.thread.read_state  # 0 if seen, 1 if unseen
+        return self._seen
+
+    @seen.setter
+    def seen(self, value: int) -> None:
+        self._seen = value
+
+    @property
+    def users_cache(self) -> Dict[str, UserShort]:
+        """User id -> UserShort of the chat participants."""
+        if self._users_cache is None:
+            # Keyed by str like DirectMessage.user_id, whatever type pk comes as
+            self._users_cache = {str(user.pk): user for user in self.thread.users}
+        return self._users_cache
 
     @staticmethod
     def _replace_emojis(text: str) -> str:
@@ -241,37 +548,28 @@ class DirectChat:
         fuzzy_match function. Currently only uses english names.
         However, you can add 2 lines to include aliases as well.
         """
+        # Most messages have no :emoji: tokens, leave those untouched
+        if not _EMOJI_TOKEN_RE.search(text):
+            return text
+
         words = text.split()
-        result = []
-
-        # Extract unique names
-        emoji_names = set()
-        # take all the english and english aliases
-        for emo in emoji.EMOJI_DATA.values():
-            if "alias" in emo:
-                if isinstance(emo["alias"], list):
-                    for alias in emo["alias"]:
-                        emoji_names.add(alias)
-            else:
-                emoji_names.add(emo["en"])
+        emoji_names, emoji_name_list = _emoji_name_index()
 
         if text in emoji_names:
             return emoji.emojize(f"{text}", language="alias")
 
-        # No need to print the set of emoji names
-        for word in words:
-            if word.startswith(":") and word.endswith(":"):
-                emoji_match = fuzzy_match(
-                    query=word, items=list(emoji_names), cutoff=0.8
+        # Score every distinct :token: once against a single list of names,
+        # then map the results back onto the words
+        tokens = {word for word in words if word.startswith(":") and word.endswith(":")}
+        replacements = {}
+        for token in tokens:
+            emoji_match = fuzzy_match(query=token, items=emoji_name_list, cutoff=0.8)
+            if emoji_match:
+                replacements[token] = emoji.emojize(
+                    f"{emoji_match[0]}", language="alias"
                 )
-                if emoji_match:
-                    result.append(emoji.emojize(f"{emoji_match[0]}", language="alias"))
-                else:
-                    result.append(word)
-            else:
-                result.append(word)
 
-        return " ".join(result)
+        return " ".join(replacements.get(word, word) for word in words)
 
     def fetch_chat_history(self, num_messages: int):
         """
@@ -283,6 +581,7 @@ class DirectChat:
             self.client.insta_client, self.thread_id, amount=num_messages
         )
         self.thread.messages = thread_data.messages
+        self._msg_by_id = None
         # self.thread.messages = self.client.insta_client.direct_messages(self.thread_id, amount=num_messages)
 
     def fetch_older_messages_chunk(self, num_messages: int):
@@ -298,6 +597,10 @@ class DirectChat:
             cursor=self.messages_cursor,
         )
         self.thread.messages += thread_data.messages
+        if self._msg_by_id is not None:
+            self._msg_by_id.update(
+                (message.id, message) for message in thread_data.messages
+            )
 
     def get_chat_history(self) -> Tuple[List[Tuple[str, str]], Dict[int, dict]]:
         """
@@ -314,6 +617,14 @@ class DirectChat:
         chat = []
         media_items = {}
         media_index = 0
+        if self._sender_names is None:
+            self._sender_names = {
+                pk: user.full_name or user.username or "Instagram User"
+                for pk, user in self.users_cache.items()
+            }
+            # Own messages are shown as "You"
+            self._sender_names[str(self.client.insta_client.user_id)] = "You"
+        sender_names = self._sender_names
 
         def process_message(
             message: DirectMessage | ReplyMessage,
@@ -322,57 +633,55 @@ class DirectChat:
             nonlocal media_index
             nonlocal media_items
 
+            # Read once, item_type is compared several times below
+            item_type = message.item_type
+
             # Skip action logs (like reactions)
-            if message.item_type == "action_log":
+            if item_type == "action_log":
                 return None
 
             # Determine message sender
-            is_self = message.user_id == str(self.client.insta_client.user_id)
-            sender = (
-                "You"
-                if is_self
-                else (
-                    self.users_cache[message.user_id].full_name
-                    or self.users_cache[message.user_id].username
-                    or "Instagram User"
-                )
-            )
+            sender = sender_names.get(message.user_id, "Instagram User")
 
             # Handle text messages
             # We handle URLs here as well because the Meta API seems to be pretty inconsistent with URL extraction,
             # sometimes it is processed by backend (link, xma_link), sometimes only handled by frontend (text)
-            if message.item_type in ["text", "link", "xma_link"]:
-                message_text = ""
-                if message.item_type == "text" or message.item_type == "xma_link":
-                    # Regular text message or inline link message
-                    message_text = message.text
-                elif message.item_type == "link":
+            if item_type in _TEXT_ITEM_TYPES:
+                if item_type == "link":
                     # Link message
                     message_text = message.link.text
+                else:
+                    # Regular text message or inline link message
+                    message_text = message.text
                 urls = extract_links_from_text(message_text)
                 if urls:
-                    # If there are links, replace them with placeholders
-                    for url in urls:
+                    # If there are links, replace them with placeholders,
+                    # splicing the text around each match in a single pass
+                    parts = []
+                    last_end = 0
+                    for orig_url, expanded_url, start, end in urls:
                         media_items[media_index] = {
-                            "type": message.item_type,
+                            "type": item_type,
                             "media_id": message.id,
                             "user_id": message.user_id,
                             "timestamp": message.timestamp,
                             "media_type": "link",
-                            "url": url[1],  # expanded URL
+                            "url": expanded_url,
                         }
-                        message_text = message_text.replace(
-                            url[0], f"[URL #{media_index}: {url[0]}]"
-                        )
+                        parts.append(message_text[last_end:start])
+                        parts.append(f"[URL #{media_index}: {orig_url}]")
+                        last_end = end
                         media_index += 1
+                    parts.append(message_text[last_end:])
+                    message_text = "".join(parts)
 
                 return MessageBrief(sender=sender, content=message_text)
 
             # For media messages, we need to process and store the media
             try:
                 # Initialize a media item entry
-                media_items[media_index] = {
-                    "type": message.item_type,
+                media_item = media_items[media_index] = {
+                    "type": item_type,
                     "media_id": message.id,
                     "user_id": message.user_id,
                     "timestamp": message.timestamp,
@@ -380,39 +689,23 @@ class DirectChat:
                 }
 
                 # Extract media metadata based on type
-                if message.item_type == "raven_media":
+                if item_type == "raven_media":
                     # Handle disappearing media
                     _process_raven_media(message, media_index)
                 elif message.media:
                     # Handle regular media (photos, videos)
                     _process_regular_media(message, media_index)
-                elif message.item_type == "generic_xma":
+                elif item_type == "generic_xma":
                     # Handle replies
-                    media_items[media_index]["media_type"] = "reply"
-                    media_items[media_index]["reply_text"] = message.text
-
-                # Generate appropriate placeholder text
-                placeholder_templates = {
-                    # Format: 'media_type': 'placeholder text'
-                    "view_once": "[Sent a view-once media (use the Instagram app to view it)]",
-                    "xma_media_share": "[Shared a post (use the Instagram app to view it)]",
-                    "image": "[Sent an image #{index}]",
-                    "video": "[Sent a video #{index}]",
-                    "audio": "[Sent an audio #{index}]",
-                    "media": "[Sent a {media_type} #{index}]",
-                    "voice_media": "[Sent a {media_type} #{index}]",
-                    "clip": "[Sent brainrot]",
-                    "animated_media": "[Sent a sticker #{index}]",
-                    "reply": "[Replied to your note/post: {reply_text}]",
-                }
+                    media_item["media_type"] = "reply"
+                    media_item["reply_text"] = message.text
 
-                media_type = media_items[media_index]["media_type"]
-                item_type = media_items[media_index]["type"]
+                media_type = media_item["media_type"]
 
                 # Get template or use fallback template
                 template = (
-                    placeholder_templates.get(media_type)
-                    or placeholder_templates.get(item_type)
+                    _PLACEHOLDER_TEMPLATES.get(media_type)
+                    or _PLACEHOLDER_TEMPLATES.get(item_type)
                     or "[Sent a {type} (use the Instagram app to view it)]"
                 )
 
@@ -421,8 +714,8 @@ class DirectChat:
                     index=media_index,
                     media_type=media_type,
                     type=item_type,
-                    url=media_items[media_index].get("url", ""),
-                    reply_text=media_items[media_index].get("reply_text", ""),
+                    url=media_item.get("url", ""),
+                    reply_text=media_item.get("reply_text", ""),
                 )
 
                 content = placeholder
@@ -443,15 +736,7 @@ class DirectChat:
                 )
 
                 # Extract URL based on media type
-                if media.video_url:
-                    media_items[index]["url"] = media.video_url
-                    media_items[index]["media_type"] = "video"
-                elif media.thumbnail_url:
-                    media_items[index]["url"] = media.thumbnail_url
-                    media_items[index]["media_type"] = "image"
-                elif media.audio_url:
-                    media_items[index]["url"] = media.audio_url
-                    media_items[index]["media_type"] = "audio"
+                media_items[index].update(_classify_media(media))
             except ValidationError:
                 # The media URL is empty likely due to a (expired?) view-once media
                 media_items[index]["url"] = None
@@ -459,47 +744,37 @@ class DirectChat:
 
         def _process_regular_media(message, index):
             """Process regular media (photos, videos)"""
-            if message.media.video_url:
-                media_items[index]["url"] = message.media.video_url
-                media_items[index]["media_type"] = "video"
-            elif message.media.thumbnail_url:
-                media_items[index]["url"] = message.media.thumbnail_url
-                media_items[index]["media_type"] = "image"
-            elif message.media.audio_url:
-                media_items[index]["url"] = message.media.audio_url
-                media_items[index]["media_type"] = "audio"
+            media_items[index].update(_classify_media(message.media))
 
         for message in self.thread.messages:
             # with open('message.txt', 'a', encoding="utf-8") as f:
             #     f.write(repr(message.reactions))
+
+            # Skip action logs (like reactions) before doing any work on them
+            if message.item_type == "action_log":
+                continue
+
             reply = None
             if message.reply:
                 reply = process_message(message.reply)
 
             reactions = None
             if message.reactions:
-                reactions_data = [
-                    reaction.emoji for reaction in message.reactions.emojis
-                ]
                 # Convert reactions into a dictionary of emoji: count
-                reactions = {
-                    emoji: reactions_data.count(emoji) for emoji in reactions_data
-                }
+                reactions = Counter(
+                    reaction.emoji for reaction in message.reactions.emojis
+                )
             msg = process_message(message)
             if msg is None:
                 continue
             chat.append(
                 MessageInfo(
-                    **{
-                        "message": msg,
-                        "reply_to": reply,
-                        "reactions": reactions,
-                        "id": message.id,
-                    }
+                    id=message.id, message=msg, reactions=reactions, reply_to=reply
                 )
             )
 
-        chat.reverse()  # Reverse the order to show latest messages at the bottom
+        # Reverse in place to show latest messages at the bottom
+        chat.reverse()
 
         # Store media items for later access
         self.media_items = media_items
@@ -513,10 +788,7 @@ class DirectChat:
         title = self.thread.thread_title
         if not title:
             title = ", ".join(
-                [
-                    user.full_name if user.full_name else user.username
-                    for user in self.thread.users
-                ]
+                user.full_name or user.username or "" for user in self.thread.users
             )
         return title
 
@@ -571,10 +843,9 @@ class DirectChat:
         - message_id: ID of the message to search for.
         """
         # logger.info(f"Searching for message ID: {message_id}")
-        for message in self.thread.messages:
-            if message.id == message_id:
-                return message
-        return None
+        if self._msg_by_id is None:
+            self._msg_by_id = {message.id: message for message in self.thread.messages}
+        return self._msg_by_id.get(message_id)
 
     def send_reply_text(self, message: str, message_id: str) -> str:
         """
@@ -675,9 +946,7 @@ class DirectChat:
             webbrowser.open(url)
             return None
 
-        save_dir = Path(Config().get("advanced.media_dir"))
-        if not save_dir.exists():
-            save_dir.mkdir(parents=True, exist_ok=True)
+        save_dir = _media_dir()
         # save_dir = configs.Config().get("advanced.media_dir", "media")
 
         # NOTE: media_item["url"] is pydantic HttpUrl object, NOT A STRING!
@@ -707,6 +976,42 @@ class DirectChat:
 
         return file_path
 
+    def download_media_batch(self, media_indices: List[int]) -> Dict[int, str]:
+        """
+        Download several media items concurrently. Links are not opened and
+        items that fail to download are left out of the result.
+        Parameters:
+        - media_indices: Indices of the media items to download.
+        Returns:
+        - Dictionary mapping media indices to downloaded file paths,
+          in the order of media_indices.
+        """
+        downloadable = [
+            index
+            for index in media_indices
+            if self.media_items.get(index, {}).get("url")
+            and self.media_items[index]["media_type"] in ["photo", "image", "video"]
+        ]
+        if not downloadable:
+            return {}
+
+        # Create the media dir once up front instead of racing on it in workers
+        _media_dir()
+
+        file_paths = {}
+        with ThreadPoolExecutor(max_workers=min(8, len(downloadable))) as executor:
+            futures = [
+                (index, executor.submit(self.media_url_download, index))
+                for index in downloadable
+            ]
+            # Collect in submission order so files open in the order asked for
+            for index, future in futures:
+                try:
+                    file_paths[index] = future.result()
+                except Exception:
+                    continue
+        return file_paths
+
     def send_latex_image(self, latex_expr: str, local: bool) -> str:
         """
         Send a LaTeX expression as an image to the chat.
@@ -714,23 +1019,29 @@ class DirectChat:
         - latex_expr: LaTeX expression to render.
         """
         # Save to the generated cahce
-        save_dir = Path(Config().get("advanced.generated_dir"))
-        if not save_dir.exists():
-            save_dir.mkdir(parents=True, exist_ok=True)
+        save_dir = _generated_dir()
 
-        filename = f"latex_{hash(latex_expr)}"
+        # Use a stable content hash (unlike the salted builtin hash) so that
+        # renders are reused across sessions, keyed by renderer as well
+        digest = hashlib.blake2b(latex_expr.encode("utf-8"), digest_size=8).hexdigest()
+        output_path = save_dir / f"latex_{'local' if local else 'online'}_{digest}.png"
 
         try:
-            if local:
-                # Render locally
-                output_path = render_latex_local(
-                    latex_expr, output_path=save_dir / f"{filename}.png"
-                )
-            else:
-                # Render online
-                output_path = render_latex_online(
-                    latex_expr, output_path=save_dir / f"{filename}.png", padding=20
-                )
+            # Only render if this expression has not been rendered before
+            if not output_path.exists():
+                try:
+                    if local:
+                        # Render locally
+                        render_latex_local(latex_expr, output_path=output_path)
+                    else:
+                        # Render online
+                        render_latex_online(
+                            latex_expr, output_path=output_path, padding=20
+                        )
+                except Exception:
+                    # Never leave a partial render behind to be reused as cached
+                    output_path.unlink(missing_ok=True)
+                    raise
             # Send the image as usual
             self.send_photo(output_path)
         except Exception as e:
@@ -1,17 +1,130 @@
+import os
+import re
 import sched
 import time
 import json
 import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable, Tuple
+from uuid import uuid4
 from instagram.client import ClientWrapper
+from instagram.configs import Config
+
+TASK_FILE_NAME = "tasks.jsonl"
+# Tasks used to be stored as a single JSON array, migrated on first read
+LEGACY_TASK_FILE_NAME = "tasks.json"
+
+
+# Shape of send_time, 'YYYY-MM-DD HH:MM:SS'
+_SEND_TIME_RE = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}")
+
+
+def _parse_send_time(send_time: str) -> float:
+    """
+    Unix timestamp of a 'YYYY-MM-DD HH:MM:SS' string.
+    Zero-padded times go through fromisoformat, which is much faster than
+    strptime; anything else (e.g. '2025-1-5 9:30:00') falls back to strptime.
+    Raises ValueError if neither can parse it.
+    """
+    if _SEND_TIME_RE.fullmatch(send_time):
+        return datetime.fromisoformat(send_time).timestamp()
+    return datetime.strptime(send_time, "%Y-%m-%d %H:%M:%S").timestamp()
+
+
+def _send_ts(task: Dict) -> float:
+    """Unix timestamp of a task's send time, parsed once for tasks that lack it."""
+    if "send_ts" not in task:
+        task["send_ts"] = _parse_send_time(task["send_time"])
+    return task["send_ts"]
+
+
+def _dump_record(record: Dict) -> str:
+    """Serialize a log record as one compact JSON line."""
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def task_file_path(username: str) -> Path:
+    """Path of the scheduled task log of a user."""
+    return Path(Config().get("advanced.users_dir")) / username / TASK_FILE_NAME
+
+
+def _migrate_legacy_task_file(path: Path) -> None:
+    """Convert a legacy tasks.json next to path into the task log format."""
+    legacy = path.with_name(LEGACY_TASK_FILE_NAME)
+    if not legacy.exists() or (path.exists() and path.stat().st_size > 0):
+        return
+    try:
+        with open(legacy, "r") as f:
+            tasks = json.load(f)
+    except json.JSONDecodeError:  # Handle empty file
+        tasks = []
+    migrated = []
+    for task in tasks:
+        task.setdefault("id", uuid4().hex)
+        try:
+            _send_ts(task)  # persist the parsed time so it is never parsed again
+        except (KeyError, TypeError, ValueError):
+            continue  # a task without a usable send time could never be sent
+        migrated.append(task)
+    write_task_log(path, migrated)
+    legacy.unlink()
+
+
+def _replay_task_log(path: Path) -> Tuple[Dict[str, Dict], int]:
+    """Replay the task log, returning the pending tasks by id and the number of records."""
+    _migrate_legacy_task_file(path)
+    tasks: Dict[str, Dict] = {}
+    num_records = 0
+    if not path.exists():
+        return tasks, 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            # Count unreadable lines too so that compaction drops them
+            num_records += 1
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # e.g. a line torn by a crash mid-write
+            if record.get("op") == "add":
+                tasks[record["task"]["id"]] = record["task"]
+            elif record.get("op") == "remove":
+                tasks.pop(record.get("id"), None)
+    return tasks, num_records
+
+
+def read_task_log(path: Path) -> List[Dict]:
+    """
+    Read the pending tasks from a task log.
+    The log is a JSON Lines file of {"op": "add", "task": {...}} and
+    {"op": "remove", "id": ...} records, so changes only append a line.
+    """
+    return list(_replay_task_log(path)[0].values())
+
+
+def append_task_log(path: Path, *records: Dict) -> None:
+    """Append records to a task log with a single fsync."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(_dump_record(record) for record in records)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_task_log(path: Path, tasks: Iterable[Dict]) -> None:
+    """Atomically rewrite a task log so it only holds the given tasks."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for task in tasks:
+            f.write(_dump_record({"op": "add", "task": task}))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
 
 
 class MessageScheduler:
     """
     A simple message scheduler that uses the `sched` module to schedule messages.
-    Messages are stored in a JSON file for persistence.
+    Messages are stored in an append-only JSON Lines log for persistence.
     It is implemented as a singleton class to ensure there is only one instance running.
     Once initialized on chat startup, it will load any pending tasks from the JSON file
     and other interfaces can access it by calling `MessageScheduler.get_instance()`.
@@ -45,10 +158,20 @@ class MessageScheduler:
         if self._initialized:
             return
 
-        self.scheduler = sched.scheduler(time.time, time.sleep)
+        # Set whenever a task is added so the scheduler thread re-checks
+        # its next deadline instead of sleeping through it
+        self._wakeup = threading.Event()
+        self.scheduler = sched.scheduler(time.time, self._sleep)
         self.task_file = task_file
         self.client = client
-        self.tasks = self.load_tasks()
+        # Guards the tasks and the log, which the scheduler thread also changes
+        self._tasks_lock = threading.RLock()
+        # Pending tasks by id, in the order they were added
+        self.tasks: Dict[str, Dict] = self.load_tasks()
+        # Queued sched events by task id, so removed tasks never fire
+        self._events: Dict[str, sched.Event] = {}
+        # Log records held back while a batch of changes is in progress
+        self._pending_records: Optional[List[Dict]] = None
         self._initialized = True
         self.running = False
 
@@ -61,27 +184,66 @@ class MessageScheduler:
             self.running = True
             threading.Thread(target=self._run_scheduler, daemon=True).start()
 
+    def _sleep(self, seconds: float) -> None:
+        """Delay function for sched that returns early when a task is added."""
+        if self._wakeup.wait(seconds):
+            self._wakeup.clear()
+
+    def _enter(self, delay: float, task: dict) -> None:
+        """Queue a task for execution after delay seconds."""
+        self._events[task["id"]] = self.scheduler.enter(
+            delay, 1, self.execute_task, argument=(task,)
+        )
+        self._wakeup.set()
+
     def _run_scheduler(self):
-        """Internal method to run the scheduler."""
+        """
+        Internal method to run the scheduler. Sleeps until the next task is
+        due (or a new one is added) instead of polling on an interval.
+        """
         while self.running:
-            self.scheduler.run(blocking=False)  # non blocking
-            time.sleep(60)  # check new tasks
-
-    def load_tasks(self):
-        """Load scheduled tasks from JSON file."""
-        if not self.task_file.exists():
-            return []
-        with open(self.task_file, "r") as f:
             try:
-                tasks = json.load(f)
-                return tasks
-            except json.JSONDecodeError:  # Handle empty file
-                return []
+                self.scheduler.run()  # returns once the queue is empty
+            except Exception:
+                pass  # a failed send must not stop the remaining tasks
+            if self.scheduler.empty():
+                self._sleep(None)  # wait for the next add
 
-    def save_tasks(self):
-        """Save tasks to JSON file."""
-        with open(self.task_file, "w") as f:
-            json.dump(self.tasks, f, indent=4)
+    def load_tasks(self):
+        """Load scheduled tasks from the task log, compacting it if needed."""
+        tasks, self._log_records = _replay_task_log(self.task_file)
+        if self._log_records > len(tasks):
+            self.save_tasks(tasks)
+        return tasks
+
+    def save_tasks(self, tasks: Dict[str, Dict] | None = None):
+        """Rewrite the task log with only the pending tasks (compaction)."""
+        with self._tasks_lock:
+            tasks = self.tasks if tasks is None else tasks
+            write_task_log(self.task_file, tasks.values())
+            self._log_records = len(tasks)
+
+    def _log(self, record: Dict) -> None:
+        """Append a record to the task log, compacting it once it holds
+        more than twice as many records as there are pending tasks."""
+        with self._tasks_lock:
+            if self._pending_records is not None:
+                self._pending_records.append(record)
+                return
+            self._append(record)
+
+    def _flush_log(self) -> None:
+        """Write the records held back by a batch in one append."""
+        with self._tasks_lock:
+            records, self._pending_records = self._pending_records, None
+            if records:
+                self._append(*records)
+
+    def _append(self, *records: Dict) -> None:
+        append_task_log(self.task_file, *records)
+        self._log_records += len(records)
+        if self._log_records > max(2 * len(self.tasks), 32):
+            self.save_tasks()
 
     def add_task(
         self,
@@ -95,20 +257,27 @@ class MessageScheduler:
         - `send_time` should be in ISO format: 'YYYY-MM-DD HH:MM:SS'
         """
         try:
-            dt = datetime.strptime(send_time, "%Y-%m-%d %H:%M:%S")
-            delay = (dt - datetime.now().replace(microsecond=0)).total_seconds()
+            send_ts = _parse_send_time(send_time)
+            delay = send_ts - time.time()
 
             if delay <= 0:
                 return "Error: Cannot schedule a message in the past. **Make sure you use 24-hour format.**"
 
-            task = {"thread_id": thread_id, "send_time": send_time, "message": message}
+            task = {
+                "id": uuid4().hex,
+                "thread_id": thread_id,
+                "send_time": send_time,
+                "send_ts": send_ts,  # so the time is never parsed again
+                "message": message,
+            }
             if display_name:
                 task["display_name"] = display_name
-            self.tasks.append(task)
-            self.save_tasks()
+            with self._tasks_lock:
+                self.tasks[task["id"]] = task
+                self._log({"op": "add", "task": task})
 
-            # Schedule execution
-            self.scheduler.enter(delay, 1, self.execute_task, argument=(task,))
+                # Schedule execution
+                self._enter(delay, task)
 
             self.start_scheduler()
 
@@ -148,7 +317,10 @@ class MessageScheduler:
         # Display header centered in window
         header = "OVERDUE MESSAGES"
         header_x = (win_width - len(header)) // 2
-        win.addstr(1, header_x, header, curses.A_BOLD | curses.color_pair(1))
+        header_attr = curses.A_BOLD | curses.color_pair(1)
+        win.addstr(1, header_x, header, header_attr)
+        # Room for text between the borders, longer lines are cut by addnstr
+        text_width = win_width - 4
 
         current_task = 0
         while current_task < len(overdue):
@@ -157,16 +329,16 @@ class MessageScheduler:
             # Clear window and redraw border and header for each task
             win.clear()
             win.box()
-            win.addstr(1, header_x, header, curses.A_BOLD | curses.color_pair(1))
+            win.addstr(1, header_x, header, header_attr)
 
             # Display task details
             line = 2
-            win.addstr(line, 2, f"Scheduled for: {task['send_time']}")
+            win.addnstr(line, 2, f"Scheduled for: {task['send_time']}", text_width)
             line += 1
             if "display_name" in task:
-                win.addstr(line, 2, f"Chat with: {task['display_name']}")
+                win.addnstr(line, 2, f"Chat with: {task['display_name']}", text_width)
                 line += 1
-            win.addstr(line, 2, f"Message: {task['message'][: win_width - 4]}")
+            win.addnstr(line, 2, f"Message: {task['message']}", text_width)
             line += 1
             win.addstr(
                 line, 2, "Press (S)end now, (D)elete, or (Q)uit", curses.color_pair(2)
@@ -182,7 +354,7 @@ class MessageScheduler:
                     status = "Message sent successfully"
                 except Exception as e:
                     status = f"Error: {str(e)}"
-                win.addstr(line + 1, 2, status.ljust(win_width - 4))
+                win.addnstr(line + 1, 2, status.ljust(text_width), text_width)
                 win.refresh()
                 curses.napms(1000)  # Show status for 1 second
                 current_task += 1
@@ -199,28 +371,39 @@ class MessageScheduler:
 
     def schedule_tasks_on_startup(self, screen=None):
         """Schedule pending tasks and handle overdue ones if screen is provided."""
-        now = datetime.now()
+        now = time.time()
 
         overdue = []
 
-        # Schedule remaining valid tasks
-        for task in self.tasks.copy():
-            dt = datetime.strptime(task["send_time"], "%Y-%m-%d %H:%M:%S")
-            delay = (dt - now).total_seconds()
+        # Schedule remaining valid tasks, holding the lock so the scheduler
+        # thread cannot remove a task mid-iteration
+        with self._tasks_lock:
+            for task in self.tasks.values():
+                delay = _send_ts(task) - now
 
-            if delay > 0:
-                self.scheduler.enter(delay, 1, self.execute_task, argument=(task,))
-            else:
-                overdue.append(task)
+                if delay > 0:
+                    self._enter(delay, task)
+                else:
+                    overdue.append(task)
 
         if overdue and screen:
-            self.handle_overdue_tasks(screen, overdue)
+            # Log the sends and deletions of the whole prompt in one write
+            with self._tasks_lock:
+                self._pending_records = []
+            try:
+                self.handle_overdue_tasks(screen, overdue)
+            finally:
+                self._flush_log()
 
         # Start the scheduler
         self.start_scheduler()
 
     def execute_task(self, task):
         """Execute scheduled task and remove from storage."""
+        with self._tasks_lock:
+            self._events.pop(task["id"], None)
+            if task["id"] not in self.tasks:
+                return  # removed after it was queued
         # print(f"\n[SENDING MESSAGE] Thread ID: {task['thread_id']} | Message: {task['message']}")
         self.client.insta_client.direct_answer(task["thread_id"], task["message"])
 
@@ -228,17 +411,25 @@ class MessageScheduler:
 
     def cancel_latest_task(self) -> str:
         """Cancel the latest scheduled task."""
-        if self.tasks:
-            task = self.tasks[-1]
-            self.remove_task(task)
-            return f"Cancelled task for {task['send_time']}"
+        with self._tasks_lock:
+            if self.tasks:
+                task = self.tasks[next(reversed(self.tasks))]
+                self.remove_task(task)
+                return f"Cancelled task for {task['send_time']}"
         return "Error: No tasks to cancel."
 
     def remove_task(self, task: dict) -> None:
-        """Remove a task."""
-        if task in self.tasks:
-            self.tasks.remove(task)
-            self.save_tasks()
+        """Remove a task and drop it from the scheduler queue if queued."""
+        with self._tasks_lock:
+            if self.tasks.pop(task["id"], None) is None:
+                return
+            event = self._events.pop(task["id"], None)
+            if event is not None:
+                try:
+                    self.scheduler.cancel(event)
+                except ValueError:
+                    pass  # already popped off the queue and running
+            self._log({"op": "remove", "id": task["id"]})
 
     @classmethod
     def get_instance(
@@ -1,5 +1,10 @@
 from typing import Tuple
+import atexit
+import heapq
 import logging
+import logging.handlers
+import queue
+from functools import lru_cache
 from difflib import SequenceMatcher
 from typing import List, TypeVar, Callable, Optional, Union
 import random
@@ -11,6 +16,7 @@ from urllib.parse import urlparse
 from uuid import uuid4
 import typer
 from instagram.configs import Config
+from .scheduler import task_file_path, read_task_log, append_task_log
 import re
 
 import instagrapi
@@ -30,6 +36,12 @@ from instagrapi.mixins.direct import SELECTED_FILTER, BOX
 import requests
 from PIL import Image, ImageOps
 
+try:
+    # Optional speedup for fuzzy_match, install with `pip install instagram-cli[fast]`
+    from rapidfuzz import fuzz as rapidfuzz_fuzz, process as rapidfuzz_process
+except ImportError:
+    rapidfuzz_fuzz = rapidfuzz_process = None
+
 
 def download_media_by_url(
     url: str,
@@ -111,19 +123,12 @@ def download_media_by_url(
     return path.resolve()
 
 
-def setup_logging(name: str):
+@lru_cache(maxsize=None)
+def _debug_log_queue() -> queue.Queue:
     """
-    Logging is the de-facto standard for debugging in this project.
-    This is because you can't simply print to console when running terminal app lol.
-    This function sets up logging for the file with the given name.
+    Queue feeding debug.log, drained by a single background listener thread
+    so that logging calls never block on disk writes.
     """
-    logging.basicConfig(filename="debug.log", level=logging.DEBUG)
-
-    # Configure logging to only capture logs from this script
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)  # Set desired log level
-
-    # Optional: Define log format
     formatter = logging.Formatter("%(levelname)s: %(message)s")
 
     # Create file handler
@@ -131,11 +136,38 @@ def setup_logging(name: str):
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
 
-    # Apply handler to your logger
-    logger.addHandler(file_handler)
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    atexit.register(listener.stop)  # write out queued records on exit
+    return log_queue
 
-    # Disable all other loggers (dependencies)
-    logging.getLogger().setLevel(logging.CRITICAL)
+
+def setup_logging(name: str):
+    """
+    Logging is the de-facto standard for debugging in this project.
+    This is because you can't simply print to console when running terminal app lol.
+    This function sets up logging for the file with the given name.
+    """
+    # Configure logging to only capture logs from this script
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.DEBUG)  # Set desired log level
+    if logger.handlers:
+        return logger  # already set up, don't attach a second handler
+
+    # Apply handler to your logger, records are written on the listener thread
+    logger.addHandler(logging.handlers.QueueHandler(_debug_log_queue()))
+    # Don't hand records on to parent loggers, which may have a debug.log
+    # handler of their own if they were set up too
+    logger.propagate = False
+
+    # Disable all other loggers (dependencies), and still give the root logger
+    # a handler: without one, their records go to logging.lastResort, which
+    # prints to stderr over the curses UI
+    root = logging.getLogger()
+    root.setLevel(logging.CRITICAL)
+    if not root.handlers:
+        root.addHandler(logging.handlers.QueueHandler(_debug_log_queue()))
 
     return logger
 
@@ -169,11 +201,12 @@ def user_info_by_username_private(
     logging.getLogger().setLevel(logging.CRITICAL)
 
     username = str(username).lower()
-    if not use_cache or username not in client._usernames_cache:
+    pk = client._usernames_cache.get(username) if use_cache else None
+    if pk is None:
         user = client.user_info_by_username_v1(username)
         client._users_cache[user.pk] = user
-        client._usernames_cache[user.username] = user.pk
-    return client.user_info(client._usernames_cache[username])
+        client._usernames_cache[user.username] = pk = user.pk
+    return client.user_info(pk)
 
 
 def direct_threads_chunk(
@@ -263,6 +296,9 @@ def direct_thread_chunk(
     while True:
         if cursor:
             params["cursor"] = cursor
+        if amount:
+            # Only ask for what is still missing on the last page
+            params["limit"] = str(min(20, max(1, amount - len(items))))
         try:
             result = client.private_request(
                 f"direct_v2/threads/{thread_id}/", params=params
@@ -270,8 +306,7 @@ def direct_thread_chunk(
         except ClientNotFoundError as e:
             raise DirectThreadNotFound(e, thread_id=thread_id, **client.last_json)
         thread = result["thread"]
-        for item in thread["items"]:
-            items.append(item)
+        items.extend(thread["items"])
         cursor = thread.get("oldest_cursor")
         if (
             not cursor
@@ -286,6 +321,23 @@ def direct_thread_chunk(
     return (extract_direct_thread(thread), cursor)
 
 
+# Navigation chains sent with media messages, as reported by the app
+_MEDIA_NAV_CHAINS = (
+    (
+        "6xQ:direct_media_picker_photos_fragment:1,5rG:direct_thread:2,"
+        "5ME:direct_quick_camera_fragment:3,5ME:direct_quick_camera_fragment:4,"
+        "4ju:reel_composer_preview:5,5rG:direct_thread:6,5rG:direct_thread:7,"
+        "6xQ:direct_media_picker_photos_fragment:8,5rG:direct_thread:9"
+    ),
+    (
+        "1qT:feed_timeline:1,7Az:direct_inbox:2,7Az:direct_inbox:3,"
+        "5rG:direct_thread:4,6xQ:direct_media_picker_photos_fragment:5,"
+        "5rG:direct_thread:6,5rG:direct_thread:7,"
+        "6xQ:direct_media_picker_photos_fragment:8,5rG:direct_thread:9"
+    ),
+)
+
+
 def direct_send_media(
     client: Client,
     path: Path,
@@ -323,20 +375,6 @@ def direct_send_media(
     )
     method = f"configure_{content_type}"
     token = client.generate_mutation_token()
-    nav_chains = [
-        (
-            "6xQ:direct_media_picker_photos_fragment:1,5rG:direct_thread:2,"
-            "5ME:direct_quick_camera_fragment:3,5ME:direct_quick_camera_fragment:4,"
-            "4ju:reel_composer_preview:5,5rG:direct_thread:6,5rG:direct_thread:7,"
-            "6xQ:direct_media_picker_photos_fragment:8,5rG:direct_thread:9"
-        ),
-        (
-            "1qT:feed_timeline:1,7Az:direct_inbox:2,7Az:direct_inbox:3,"
-            "5rG:direct_thread:4,6xQ:direct_media_picker_photos_fragment:5,"
-            "5rG:direct_thread:6,5rG:direct_thread:7,"
-            "6xQ:direct_media_picker_photos_fragment:8,5rG:direct_thread:9"
-        ),
-    ]
     kwargs = {}
     data = {
         "action": "send_item",
@@ -344,7 +382,7 @@ def direct_send_media(
         "send_attribution": "direct_thread",
         "client_context": token,
         "mutation_token": token,
-        "nav_chain": random.choices(nav_chains),
+        "nav_chain": random.choice(_MEDIA_NAV_CHAINS),
         "offline_threading_id": token,
     }
     if content_type == "video":
@@ -374,6 +412,15 @@ def direct_send_media(
     return extract_direct_message(result["payload"])
 
 
+# Constant rupload parameters, encoded once
+_RUPLOAD_RETRY_CONTEXT = (
+    '{"num_step_auto_retry":0,"num_reupload":0,"num_step_manual_retry":0}'
+)
+_RUPLOAD_IMAGE_COMPRESSION = json.dumps(
+    {"lib_name": "moz", "lib_version": "3.1.m", "quality": "80"}
+)
+
+
 def photo_rupload(
     client: Client,
     path: Path,
@@ -423,13 +470,11 @@ def photo_rupload(
     )
     # media_type: "2" when from video/igtv/album thumbnail, "1" - upload photo only
     rupload_params = {
-        "retry_context": '{"num_step_auto_retry":0,"num_reupload":0,"num_step_manual_retry":0}',
+        "retry_context": _RUPLOAD_RETRY_CONTEXT,
         "media_type": "1",  # "2" if upload_id else "1",
         "xsharing_user_ids": "[]",
         "upload_id": upload_id,
-        "image_compression": json.dumps(
-            {"lib_name": "moz", "lib_version": "3.1.m", "quality": "80"}
-        ),
+        "image_compression": _RUPLOAD_IMAGE_COMPRESSION,
     }
     if to_album:
         rupload_params["is_sidecar"] = "1"
@@ -472,8 +517,8 @@ def photo_rupload(
         )
         last_json = client.last_json  # local variable for read in sentry
         raise PhotoNotUpload(response.text, response=response, **last_json)
-    with Image.open(path) as im:
-        width, height = im.size
+    # Dimensions of the prepared image that was uploaded, not the source file
+    width, height = photo_size
     return upload_id, width, height
 
 
@@ -491,8 +536,9 @@ def fuzzy_match(
 ) -> Union[List[Tuple[Union[str, T], float]], Tuple[Union[str, T], float], None]:
     """
     Find the closest matching items using fuzzy string matching.
-    This is an implementation of the fuzzywuzzy library without the dependency.
-    Uses built-in SequenceMatcher to find similarity ratio between strings.
+    Uses RapidFuzz (C++ Levenshtein) when it is installed, otherwise falls back
+    to an implementation of the fuzzywuzzy library without the dependency,
+    using built-in SequenceMatcher to find similarity ratio between strings.
 
     Parameters:
     - query: String to match against
@@ -510,41 +556,75 @@ def fuzzy_match(
     if not items:
         return [] if n > 1 else None
 
-    matcher = SequenceMatcher(None, key(query))
-    matches = []
+    # Processed strings in item order, computed once per item
+    choices = [
+        key(
+            (item if isinstance(item, str) else str(item))
+            if getter is None
+            else getter(item)
+        )
+        for item in items
+    ]
+    query = key(query)
 
-    for item in items:
-        # Get string to match from item
-        if getter is None:
-            if isinstance(item, str):
-                extracted = item
-            else:
-                extracted = str(item)
-        else:
-            extracted = getter(item)
+    if rapidfuzz_process is not None:
+        # RapidFuzz reports the index of each match in choices
+        scorer = (
+            rapidfuzz_fuzz.partial_ratio if use_partial_ratio else rapidfuzz_fuzz.ratio
+        )
 
-        if use_partial_ratio:
+        if n == 1:
+            # extractOne raises its cutoff as better matches are found and stops
+            # at a perfect score, so a single best match avoids scoring everything fully
+            best = rapidfuzz_process.extractOne(
+                query, choices, scorer=scorer, score_cutoff=cutoff * 100
+            )
+            # RapidFuzz scores are 0-100, keep the 0.0-1.0 ratios of the public API
+            return (items[best[2]], best[1] / 100) if best else None
+
+        results = rapidfuzz_process.extract(
+            query, choices, scorer=scorer, score_cutoff=cutoff * 100, limit=n
+        )
+        matches = [(items[idx], score / 100) for _, score, idx in results]
+        return matches if matches else None
+
+    # No autojunk, which treats frequent characters of strings over 200
+    # characters as junk and skews their scores
+    matcher = SequenceMatcher(None, query, autojunk=False)
+    # Scores the query against each matching block on the partial ratio path
+    block_matcher = SequenceMatcher(None, query, autojunk=False)
+    matches = []
+
+    for item, s2 in zip(items, choices):
+        if s2 == query:
+            ratio = 1.0  # identical strings need no scoring
+            if n == 1 and not use_partial_ratio and ratio >= cutoff:
+                # Only identical strings score 1.0 here, so no later item
+                # can beat or tie-break ahead of the first one
+                return (item, ratio)
+        elif use_partial_ratio:
             # Find the best matching substring
-            s2 = key(extracted)
             matcher.set_seq2(s2)
             blocks = matcher.get_matching_blocks()
             ratios = []
             for _, j, size in blocks:
                 if size == 0:
                     continue
-                block = s2[j : j + size]
-                m = SequenceMatcher(None, key(query), block)
-                ratios.append(m.ratio())
+                block_matcher.set_seq2(s2[j : j + size])
+                ratios.append(block_matcher.ratio())
             ratio = max(ratios) if ratios else 0
         else:
-            matcher.set_seq2(key(extracted))
+            matcher.set_seq2(s2)
+            # Cheap upper bounds of ratio(), skip items that cannot reach cutoff
+            if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                continue
             ratio = matcher.ratio()
 
         if ratio >= cutoff:
             matches.append((item, ratio))
 
-    matches.sort(key=lambda x: x[1], reverse=True)
-    matches = matches[:n]
+    # Same order as a stable descending sort, without sorting every match
+    matches = heapq.nlargest(n, matches, key=lambda x: x[1])
 
     return matches[0] if n == 1 and matches else matches if matches else None
 
@@ -595,7 +675,7 @@ def render_latex_local(latex_expr, output_path="latex_local.png", padding=None):
 
 def list_all_scheduled_tasks(filepath: str = None) -> list[dict]:
     """
-    List all scheduled tasks for the current user from the JSON file.
+    List all scheduled tasks for the current user from the task log.
     """
     if filepath is None:
         username = Config().get("login.current_username")
@@ -604,20 +684,16 @@ def list_all_scheduled_tasks(filepath: str = None) -> list[dict]:
                 "You are not logged in. Please login first.\nSuggested action: `instagram auth login`"
             )
             return []
-        filepath = Path(Config().get("advanced.users_dir")) / username / "tasks.json"
-
-    if not Path(filepath).exists():
-        return []
+        filepath = task_file_path(username)
 
-    with open(filepath, "r") as f:
-        return json.load(f)
+    return read_task_log(Path(filepath))
 
 
 def cancel_scheduled_task_by_index(index: int, filepath: str = None) -> str:
     """
-    Cancel a scheduled task by index from the JSON file.
+    Cancel a scheduled task by index from the task log.
     NOTE: This does not need to involve the scheduler itself because
-    on scheduler startup it will then load the new JSON tasks.
+    on scheduler startup it will then load the new tasks.
     """
     if filepath is None:
         username = Config().get("login.current_username")
@@ -626,22 +702,25 @@ def cancel_scheduled_task_by_index(index: int, filepath: str = None) -> str:
                 "You are not logged in. Please login first.\nSuggested action: `instagram auth login`"
             )
             return "You are not logged in. Please login first."
-        filepath = Path(Config().get("advanced.users_dir")) / username / "tasks.json"
+        filepath = task_file_path(username)
 
     tasks = list_all_scheduled_tasks(filepath)
 
     if index < 0 or index >= len(tasks):
         return "Invalid index. No task was cancelled."
 
-    tasks.pop(index)
-
-    with open(filepath, "w") as f:
-        json.dump(tasks, f, indent=4)
+    append_task_log(Path(filepath), {"op": "remove", "id": tasks[index]["id"]})
 
     return f"Cancelled task at index {index}."
 
 
-def extract_links_from_text(text: str) -> List[Tuple[str, str]]:
+# Source: https://stackoverflow.com/a/50790119
+_URL_RE = re.compile(
+    r"\b((?:https?://)?(?:(?:www\.)?(?:[\da-z\.-]+)\.(?:[a-z]{2,6})|(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)|(?:(?:[0-9a-fA-F]{1,4}:){7,7}[0-9a-fA-F]{1,4}|(?:[0-9a-fA-F]{1,4}:){1,7}:|(?:[0-9a-fA-F]{1,4}:){1,6}:[0-9a-fA-F]{1,4}|(?:[0-9a-fA-F]{1,4}:){1,5}(?::[0-9a-fA-F]{1,4}){1,2}|(?:[0-9a-fA-F]{1,4}:){1,4}(?::[0-9a-fA-F]{1,4}){1,3}|(?:[0-9a-fA-F]{1,4}:){1,3}(?::[0-9a-fA-F]{1,4}){1,4}|(?:[0-9a-fA-F]{1,4}:){1,2}(?::[0-9a-fA-F]{1,4}){1,5}|[0-9a-fA-F]{1,4}:(?:(?::[0-9a-fA-F]{1,4}){1,6})|:(?:(?::[0-9a-fA-F]{1,4}){1,7}|:)|fe80:(?::[0-9a-fA-F]{0,4}){0,4}%[0-9a-zA-Z]{1,}|::(?:ffff(?::0{1,4}){0,1}:){0,1}(?:(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3,3}(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])|(?:[0-9a-fA-F]{1,4}:){1,4}:(?:(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3,3}(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])))(?::[0-9]{1,4}|[1-5][0-9]{4}|6[0-4][0-9]{3}|65[0-4][0-9]{2}|655[0-2][0-9]|6553[0-5])?(?:/[\w\.-]*)*/?)\b"
+)
+
+
+def extract_links_from_text(text: str) -> List[Tuple[str, str, int, int]]:
     """
     Extract URLs or links from a given text string.
     Extracts both complete URLs and partial ones
@@ -652,20 +731,17 @@ def extract_links_from_text(text: str) -> List[Tuple[str, str]]:
 
     Returns:
     - List of extracted URLs and their expanded versions.
-    - Each URL is returned as a tuple (original_url, expanded_url).
+    - Each URL is returned as a tuple (original_url, expanded_url, start, end),
+      where text[start:end] == original_url.
     - If no URLs are found, returns an empty list.
     """
-    # Source: https://stackoverflow.com/a/50790119
-    regex = r"\b((?:https?://)?(?:(?:www\.)?(?:[\da-z\.-]+)\.(?:[a-z]{2,6})|(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)|(?:(?:[0-9a-fA-F]{1,4}:){7,7}[0-9a-fA-F]{1,4}|(?:[0-9a-fA-F]{1,4}:){1,7}:|(?:[0-9a-fA-F]{1,4}:){1,6}:[0-9a-fA-F]{1,4}|(?:[0-9a-fA-F]{1,4}:){1,5}(?::[0-9a-fA-F]{1,4}){1,2}|(?:[0-9a-fA-F]{1,4}:){1,4}(?::[0-9a-fA-F]{1,4}){1,3}|(?:[0-9a-fA-F]{1,4}:){1,3}(?::[0-9a-fA-F]{1,4}){1,4}|(?:[0-9a-fA-F]{1,4}:){1,2}(?::[0-9a-fA-F]{1,4}){1,5}|[0-9a-fA-F]{1,4}:(?:(?::[0-9a-fA-F]{1,4}){1,6})|:(?:(?::[0-9a-fA-F]{1,4}){1,7}|:)|fe80:(?::[0-9a-fA-F]{0,4}){0,4}%[0-9a-zA-Z]{1,}|::(?:ffff(?::0{1,4}){0,1}:){0,1}(?:(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3,3}(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])|(?:[0-9a-fA-F]{1,4}:){1,4}:(?:(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3,3}(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])))(?::[0-9]{1,4}|[1-5][0-9]{4}|6[0-4][0-9]{3}|65[0-4][0-9]{2}|655[0-2][0-9]|6553[0-5])?(?:/[\w\.-]*)*/?)\b"
-
-    matches = re.findall(regex, text)
-
     # Expand partial URLs to proper URLs
     res = []
-    for orig_url in matches:
+    for match in _URL_RE.finditer(text):
+        orig_url = match.group(1)
         expanded_url = orig_url
         if not orig_url.startswith("http://") and not orig_url.startswith("https://"):
             expanded_url = "https://" + orig_url
-        res.append((orig_url, expanded_url))
+        res.append((orig_url, expanded_url, match.start(1), match.end(1)))
 
     return res
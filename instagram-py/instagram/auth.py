@@ -1,11 +1,13 @@
 import typer
-from instagram.client import ClientWrapper, LoginRequired
+from typing import TYPE_CHECKING
 from instagram import configs
 from pathlib import Path
 from rich.console import Console
 from rich.spinner import Spinner
 from rich.live import Live
-from instagram.client import spinner_controller_var
+
+if TYPE_CHECKING:
+    from instagram.client import ClientWrapper
 
 
 class SpinnerController:
@@ -37,8 +39,11 @@ class SpinnerController:
         self.spinner.text = message
 
 
-def login() -> ClientWrapper | None:
+def login() -> "ClientWrapper | None":
     """Login to Instagram"""
+    # Imported here so that commands that never log in don't load instagrapi
+    from instagram.client import ClientWrapper, LoginRequired, spinner_controller_var
+
     config = configs.Config()
     current_username = config.get("login.current_username", None)
 
@@ -63,8 +68,10 @@ def login() -> ClientWrapper | None:
         return login_by_username()
 
 
-def login_by_username() -> ClientWrapper | None:
+def login_by_username() -> "ClientWrapper | None":
     """Login to Instagram using username and password"""
+    from instagram.client import ClientWrapper, spinner_controller_var
+
     username = typer.prompt("Username")
     password = typer.prompt("Password", hide_input=True)
     verification_code = ""
@@ -95,6 +102,8 @@ def login_by_username() -> ClientWrapper | None:
 
 def logout(username=None):
     """Logout from Instagram"""
+    from instagram.client import ClientWrapper, LoginRequired, spinner_controller_var
+
     # Get current username from config if none provided
     if not username:
         config = configs.Config()
@@ -1,12 +1,13 @@
-from copy import deepcopy
 from typing import Dict, Protocol
 import instagrapi
 import instagrapi.exceptions
 import instagrapi.types
 from instagram.configs import Config
+import json
 import os
 import shutil
-import pickle
+import threading
+import time
 
 
 class ClientWrapper(Protocol):
@@ -19,34 +20,78 @@ class CacheManager:
     PUBLIC_API = 0b10
     PRIVATE_API = 0b100
 
+    # Users cached by id are fetched again after this many seconds
+    USER_TTL = 24 * 60 * 60
+    # Each user cache keeps at most this many users, least recently used go first
+    MAX_USERS = 10_000
+    # Both caches and the fetch times are persisted together in this JSON file
+    CACHE_FILE = "users.json"
+
     def __init__(self, client: ClientWrapper):
         self.client = client
         self.config = Config()
-        self.userid_user_cache: Dict[int, instagrapi.types.User] = {}
+        # Both caches are kept in least to most recently used order. Callers get
+        # shallow model_copy()s of cached users, so setting fields on a returned
+        # user never changes the cache (deepcopy is far slower on pydantic models)
+        self.userid_user_cache: Dict[str, instagrapi.types.User] = {}
         self.username_user_cache: Dict[str, instagrapi.types.User] = {}
+        # user id -> time.time() the user was fetched, persisted with the cache
+        self.userid_fetched_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        # user id -> event set once the thread fetching that user is done
+        self._inflight: Dict[str, threading.Event] = {}
 
     def dump_cache(self):
-        cache_dir = self.secure_cache_dir()
+        path = os.path.join(self.secure_cache_dir(), self.CACHE_FILE)
 
-        with open(os.path.join(cache_dir, "userid_user.pkl"), "wb") as f:
-            pickle.dump(self.userid_user_cache, f)
-        with open(os.path.join(cache_dir, "username_user.pkl"), "wb") as f:
-            pickle.dump(self.username_user_cache, f)
+        with self._lock:
+            data = {
+                "userid_user": {
+                    user_id: user.model_dump(mode="json")
+                    for user_id, user in self.userid_user_cache.items()
+                },
+                "username_user": {
+                    username: user.model_dump(mode="json")
+                    for username, user in self.username_user_cache.items()
+                },
+                "userid_fetched_at": dict(self.userid_fetched_at),
+            }
+        # Write to a temporary file first so a crash never leaves a torn cache
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
 
     def load_cache(self):
-        cache_dir = self.secure_cache_dir()
+        path = os.path.join(self.secure_cache_dir(), self.CACHE_FILE)
 
         try:
-            with open(os.path.join(cache_dir, "userid_user.pkl"), "rb") as f:
-                self.userid_user_cache = pickle.load(f)
-            with open(os.path.join(cache_dir, "username_user.pkl"), "rb") as f:
-                self.username_user_cache = pickle.load(f)
-        except (pickle.PickleError, FileNotFoundError):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.userid_user_cache = {
+                user_id: instagrapi.types.User.model_validate(user)
+                for user_id, user in data["userid_user"].items()
+            }
+            self.username_user_cache = {
+                username: instagrapi.types.User.model_validate(user)
+                for username, user in data["username_user"].items()
+            }
+        # ValueError covers malformed JSON and users that fail validation
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
             self.clear_cache()
+            return
+
+        self.userid_fetched_at = data.get("userid_fetched_at", {})
+        # Drop users that have expired (or predate fetch times) so they are refetched
+        for user_id in list(self.userid_user_cache):
+            if not self._is_fresh(str(user_id)):
+                del self.userid_user_cache[user_id]
+                self.userid_fetched_at.pop(str(user_id), None)
 
     def clear_cache(self, full: bool = False):
         self.userid_user_cache.clear()
         self.username_user_cache.clear()
+        self.userid_fetched_at.clear()
 
         if full:
             # clear cache directory (rm -rf)
@@ -65,6 +110,51 @@ class CacheManager:
             os.makedirs(cache_dir)
         return cache_dir
 
+    def _is_fresh(self, user_id: str) -> bool:
+        """Whether the user cached under user_id was fetched within USER_TTL."""
+        return time.time() - self.userid_fetched_at.get(user_id, 0) < self.USER_TTL
+
+    def _recall(
+        self, cache: Dict[str, instagrapi.types.User], key: str
+    ) -> instagrapi.types.User | None:
+        """Get a cached user and mark it as most recently used."""
+        with self._lock:
+            user = cache.pop(key, None)
+            if user is not None:
+                cache[key] = user
+            return user
+
+    def _remember(
+        self, cache: Dict[str, instagrapi.types.User], key: str, user
+    ) -> None:
+        """Cache a user, evicting the least recently used ones over MAX_USERS."""
+        with self._lock:
+            cache.pop(key, None)
+            cache[key] = user
+            if cache is self.userid_user_cache:
+                self.userid_fetched_at[key] = time.time()
+            while len(cache) > self.MAX_USERS:
+                evicted = next(iter(cache))
+                del cache[evicted]
+                if cache is self.userid_user_cache:
+                    self.userid_fetched_at.pop(evicted, None)
+
+    def _claim_fetch(self, user_id: str) -> threading.Event | None:
+        """
+        Register the calling thread as the one fetching user_id.
+        Returns the event of the thread already fetching it instead, if any.
+        """
+        with self._lock:
+            event = self._inflight.get(user_id)
+            if event is None:
+                self._inflight[user_id] = threading.Event()
+            return event
+
+    def _release_fetch(self, user_id: str) -> None:
+        """Wake the threads waiting for the fetch of user_id."""
+        with self._lock:
+            self._inflight.pop(user_id).set()
+
     def get_username_from_id(
         self, user_id: int, fetch_mode: int = CACHE | PUBLIC_API
     ) -> str | None:
@@ -81,39 +171,67 @@ class CacheManager:
         self, user_id: int, fetch_mode: int = CACHE | PUBLIC_API | PRIVATE_API
     ) -> instagrapi.types.User | None:
         user_id = str(user_id)
-        if not (fetch_mode & self.CACHE) or user_id not in self.userid_user_cache:
+        if fetch_mode & self.CACHE:
+            user = self._cached_user_by_id(user_id)
+            if user is not None:
+                return user
+
+        # Only one thread fetches a given user, the others wait for its result
+        pending = self._claim_fetch(user_id)
+        if pending is not None:
+            pending.wait()
+            if fetch_mode & self.CACHE:
+                user = self._cached_user_by_id(user_id)
+                if user is not None:
+                    return user
+            # The other fetch failed or a fresh fetch was asked for, fetch directly
+            return self._fetch_user_by_id(user_id, fetch_mode)
+        try:
+            return self._fetch_user_by_id(user_id, fetch_mode)
+        finally:
+            self._release_fetch(user_id)
+
+    def _cached_user_by_id(self, user_id: str) -> instagrapi.types.User | None:
+        """Copy of the user cached under user_id if it is still fresh."""
+        if not self._is_fresh(user_id):
+            return None
+        user = self._recall(self.userid_user_cache, user_id)
+        # return copy of cache (dict changes protection)
+        return user.model_copy() if user is not None else None
+
+    def _fetch_user_by_id(
+        self, user_id: str, fetch_mode: int
+    ) -> instagrapi.types.User | None:
+        """Fetch a user by id from the APIs allowed by fetch_mode and cache it."""
+        try:
+            if not (fetch_mode & self.PUBLIC_API):
+                raise instagrapi.exceptions.ClientError()
             try:
-                if not (fetch_mode & self.PUBLIC_API):
-                    raise instagrapi.exceptions.ClientError()
+                user = self.client.insta_client.user_info_gql(user_id)
+            except instagrapi.exceptions.ClientLoginRequired as e:
+                if not self.client.insta_client.inject_sessionid_to_public():
+                    raise e
+                user = self.client.insta_client.user_info_gql(user_id)  # retry
+        except Exception as e:
+            if not isinstance(e, instagrapi.exceptions.ClientError):
+                self.client.insta_client.logger.exception(e)
+            if fetch_mode & self.PRIVATE_API:
                 try:
-                    user = self.client.insta_client.user_info_gql(user_id)
-                except instagrapi.exceptions.ClientLoginRequired as e:
-                    if not self.client.insta_client.inject_sessionid_to_public():
-                        raise e
-                    user = self.client.insta_client.user_info_gql(user_id)  # retry
-            except Exception as e:
-                if not isinstance(e, instagrapi.exceptions.ClientError):
-                    self.client.insta_client.logger.exception(e)
-                if fetch_mode & self.PRIVATE_API:
-                    try:
-                        user = self.client.insta_client.user_info_v1(user_id)
-                    except instagrapi.exceptions.UserNotFound:
-                        return None
-                else:
+                    user = self.client.insta_client.user_info_v1(user_id)
+                except instagrapi.exceptions.UserNotFound:
                     return None
-            self.client.insta_client._users_cache[user_id] = user
-            self.client.insta_client._usernames_cache[user.username] = user.pk
-            self.userid_user_cache[user_id] = deepcopy(user)
-        return deepcopy(
-            self.userid_user_cache[user_id]
-        )  # return copy of cache (dict changes protection)
+            else:
+                return None
+        self.client.insta_client._users_cache[user_id] = user
+        self.client.insta_client._usernames_cache[user.username] = user.pk
+        self._remember(self.userid_user_cache, user_id, user)
+        return user.model_copy()
 
     def get_user_from_username(
         self, username: str, fetch_mode: int = CACHE | PUBLIC_API | PRIVATE_API
     ) -> instagrapi.types.User | None:
         username = str(username).lower()
-        self.client.insta_client.user_info_by_username
-        if (not fetch_mode & self.CACHE) or username not in self.username_userid_cache:
+        if (not fetch_mode & self.CACHE) or username not in self.username_user_cache:
             try:
                 if fetch_mode & self.PUBLIC_API:
                     try:
@@ -142,5 +260,7 @@ class CacheManager:
                         return None
                 else:
                     return None
-            self.username_user_cache[username] = user
-        return deepcopy(self.username_user_cache[username])
+            self._remember(self.username_user_cache, username, user)
+            return user.model_copy()
+        user = self._recall(self.username_user_cache, username)
+        return user.model_copy() if user is not None else None
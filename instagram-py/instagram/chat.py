@@ -21,6 +21,7 @@ from instagram.api import (
     MessageScheduler,
     DirectThreadNotFound,
 )
+from instagram.api.scheduler import task_file_path
 from instagram.configs import Config
 
 from instagram.chat_ui.interface.chat_interface import ChatInterface
@@ -44,7 +45,7 @@ def start_chat(username: str | None = None, search_filter: str = "") -> None:
 
     def init_chat(screen):
         # Initialize scheduler with screen for handling overdue messages (this is only done once)
-        path = Path(Config().get("advanced.users_dir")) / client.username / "tasks.json"
+        path = task_file_path(client.username)
         if not path.exists():
             path.parent.mkdir(parents=True, exist_ok=True)
             path.touch()
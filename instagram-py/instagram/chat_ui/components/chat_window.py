@@ -44,11 +44,15 @@ class ChatWindow:
         Build wrapped lines for chat messages with word wrapping and formatting.
         """
         lines_buffer: List[LineInfo] = []
+        # Read once, these do not change while building
+        use_colors = Config().get("chat.colors")
+        compact = Config().get("chat.layout") == "compact"
 
         # Build wrapped lines from oldest to newest
         for msg_idx, msg in enumerate(self.messages):
             sender_text = msg.message.sender + ": "
             sender_width = len(sender_text)
+            sender_indent = " " * sender_width
 
             # Handle the main message
             content_width = self.width - sender_width - 1
@@ -58,7 +62,7 @@ class ChatWindow:
             ]
 
             # Determine color index
-            if Config().get("chat.colors"):
+            if use_colors:
                 color_idx = (hash(msg.message.sender) % 3) + 4
             else:
                 color_idx = 0  # no color
@@ -99,7 +103,7 @@ class ChatWindow:
                                 is_selected,
                                 color_idx,
                                 sender_width,
-                                " " * sender_width,
+                                sender_indent,
                                 False,
                             )
                         )
@@ -121,7 +125,7 @@ class ChatWindow:
             # Handle reply-to message if present
             if msg.reply_to:
                 reply_sender = msg.reply_to.sender + ": "
-                reply_indent = " " * sender_width + "| "
+                reply_indent = sender_indent + "| "
                 max_reply_content = (
                     self.width - len(reply_sender) - len(reply_indent) - 1
                 )
@@ -134,7 +138,7 @@ class ChatWindow:
 
             # Add reactions if present
             if msg.reactions:
-                reaction_text = " " * sender_width
+                reaction_text = sender_indent
                 reaction_list = []
                 for reaction, count in msg.reactions.items():
                     reaction_list.append(f"{reaction}x{count}")
@@ -142,7 +146,7 @@ class ChatWindow:
                 lines_buffer.append((msg_idx, reaction_line, False, 0, 0, "", True))
 
             # Add a blank line after each message if layout not compact
-            if Config().get("chat.layout") != "compact":
+            if not compact:
                 lines_buffer.append((msg_idx, "", False, 0, 0, "", False))
         self.messages_lines = lines_buffer
 
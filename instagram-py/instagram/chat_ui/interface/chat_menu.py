@@ -149,6 +149,9 @@ class ChatMenu:
             elif self.selection > 0:
                 self.selection -= 1
         elif key == curses.KEY_DOWN:
+            if self.selection >= len(self.chats) - 5:
+                # Start loading the next chunk before the user reaches the end
+                self.dm.prefetch_next_chat_chunk(20, 20)
             if self.selection == len(self.chats) - 1:
                 # Fetch more DMs
                 self._draw_footer("Loading more chats...")
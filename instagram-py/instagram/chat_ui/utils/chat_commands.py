@@ -75,33 +75,48 @@ def back_to_chat_list(context) -> str:
 
 @cmd_registry.register(
     "view",
-    "View media in chat by index of media item",
+    "View media in chat by index of media item, several indices are downloaded in parallel",
     required_args=["index"],
     shorthand="v",
 )
-def view_media(context, index: int) -> str:
+def view_media(context, index: int, *more_indices: int) -> str:
     """
     View media in chat. Takes the index of the media item to view.
     Downloads the media to a temporary file and opens it with system viewer.
+    With more than one index (e.g. :view 1 4 7) the media are downloaded
+    concurrently and links are skipped.
     """
     chat: DirectChat = context["chat"]
     try:
-        file_path = chat.media_url_download(int(index))
-
-        if file_path is None:
-            return "URL opened in browser"
-
-        # Open with system default application
-        if os.name == "posix":  # macOS and Linux
-            subprocess.run(
-                ["xdg-open" if os.uname().sysname == "Linux" else "open", file_path],
-                check=True,
-            )
-        elif os.name == "nt":  # Windows
-            subprocess.run(["start", file_path], shell=True, check=True)
+        if more_indices:
+            indices = [int(i) for i in (index, *more_indices)]
+            file_paths = list(chat.download_media_batch(indices).values())
+            if not file_paths:
+                return "No downloadable media at the given indices"
         else:
-            return "Unsupported operating system"
+            file_path = chat.media_url_download(int(index))
+
+            if file_path is None:
+                return "URL opened in browser"
+            file_paths = [file_path]
+
+        for file_path in file_paths:
+            # Open with system default application
+            if os.name == "posix":  # macOS and Linux
+                subprocess.run(
+                    [
+                        "xdg-open" if os.uname().sysname == "Linux" else "open",
+                        file_path,
+                    ],
+                    check=True,
+                )
+            elif os.name == "nt":  # Windows
+                subprocess.run(["start", file_path], shell=True, check=True)
+            else:
+                return "Unsupported operating system"
 
+        if more_indices:
+            return f"Opening {len(file_paths)} media"
         return f"Opening media #{index}"
 
     except ValueError:
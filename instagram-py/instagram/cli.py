@@ -1,5 +1,8 @@
 import typer
-from instagram import auth, chat, api, configs, client, __version__
+
+# Commands import chat, api and client when they run, since those pull in
+# instagrapi and the curses UI, which --help, config and switch do not need
+from instagram import auth, configs, __version__
 from art import text2art
 from rich.console import Console
 from rich.table import Table
@@ -100,6 +103,8 @@ def switch(
 def start(ctx: typer.Context):
     """Open chat UI"""
     if ctx.invoked_subcommand is None:
+        from instagram import chat
+
         chat.start_chat(None)
 
 
@@ -119,12 +124,15 @@ def search(
         filter += "u"
     if _t:
         filter += "t"
+    from instagram import chat
+
     chat.start_chat(username, filter)
 
 
 @schedule_app.command()
 def ls():
     """List all scheduled messages"""
+    from instagram import api
 
     console = Console()
     tasks = api.list_all_scheduled_tasks()
@@ -151,12 +159,16 @@ def cancel(
     ),
 ):
     """Cancel a scheduled message"""
+    from instagram import api
+
     api.cancel_scheduled_task_by_index(task_id)
 
 
 @app.command()
 def notify():
     """Show latest notifications"""
+    from instagram import api
+
     api.show_updates()
 
 
@@ -167,6 +179,8 @@ def stats(
     ),
 ):
     """Show analytics"""
+    from instagram import api
+
     api.analytics_bar_graph(last_n_days=days)
 
 
@@ -193,6 +207,8 @@ def cleanup(
     ),
 ):
     """Cleanup cache and temporary files"""
+    from instagram import client
+
     client.cleanup(d_all)
 
 
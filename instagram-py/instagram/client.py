@@ -1,11 +1,16 @@
 import typer
 import instagrapi
+from requests.adapters import HTTPAdapter
 from instagrapi.exceptions import LoginRequired
 from instagrapi.mixins.challenge import ChallengeChoice
 from pathlib import Path
 from instagram.configs import Config
 from typing import Callable
+from functools import lru_cache, wraps
 import contextvars
+import shutil
+import threading
+import time
 
 # This is a global variable that is used to store the spinner controller
 # This makes it safe across threads and async processes
@@ -32,6 +37,61 @@ def default_challenge_code_handler(username, choice):
     return False
 
 
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+    Allows bursts of up to `capacity` calls, refilled at `rate` calls per second.
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take a token, blocking until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            # Reserve the token now (possibly going negative) so concurrent
+            # callers queue up behind each other instead of all waking at once
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+@lru_cache(maxsize=None)
+def _api_rate_limiter() -> TokenBucket | None:
+    """
+    Rate limiter shared by every instagrapi client in this process.
+    None if max_requests_per_minute is 0 or less, which means unlimited.
+    """
+    per_minute = Config().get("advanced.max_requests_per_minute")
+    if per_minute <= 0:
+        return None
+    return TokenBucket(rate=per_minute / 60, capacity=10)
+
+
+def _rate_limited(request: Callable) -> Callable:
+    """Wrap an instagrapi request method so it waits on the shared rate limiter."""
+    limiter = _api_rate_limiter()
+    if limiter is None:
+        return request
+
+    @wraps(request)
+    def wrapper(*args, **kwargs):
+        limiter.acquire()
+        return request(*args, **kwargs)
+
+    return wrapper
+
+
 class SessionManager:
     def __init__(self, username: str | None) -> None:
         """
@@ -103,6 +163,22 @@ class ClientWrapper:
         cl = instagrapi.Client()
         cl.challenge_code_handler = self.challenge_handler
         cl.delay_range = [1, 3]
+        # Every API call goes through one of these, so concurrent features
+        # (prefetching, bulk actions) all share a single request budget
+        cl.private_request = _rate_limited(cl.private_request)
+        cl.public_request = _rate_limited(cl.public_request)
+        # instagrapi's sessions already keep connections alive, but requests
+        # only pools 10 per host, so parallel calls (prefetch, bulk actions,
+        # the refresh thread) would keep discarding and re-handshaking them.
+        # Keep instagrapi's retry policy, which lives on the adapter we replace
+        for session in (cl.private, cl.public):
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=32,
+                max_retries=session.get_adapter("https://").max_retries,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
         return cl
 
     def login(
@@ -215,7 +291,11 @@ def cleanup(delete_all: bool) -> None:
     )
     if cache_dir.exists():
         for file in cache_dir.iterdir():
-            file.unlink()
+            # Per-user CacheManager data lives in a subdirectory
+            if file.is_dir():
+                shutil.rmtree(file)
+            else:
+                file.unlink()
 
     if media_dir.exists():
         for file in media_dir.iterdir():
@@ -37,6 +37,8 @@ DEFAULT_CONFIG = {
         "debug_mode": False,
         "data_dir": str(pathlib.Path.home() / ".instagram-cli"),
         "georgist_credits": 627,
+        # Upper bound on Instagram API requests, shared by all features (0 = no limit)
+        "max_requests_per_minute": 60,
     },
 }
 DEFAULT_CONFIG["advanced"]["users_dir"] = str(
@@ -0,0 +1,68 @@
+"""
+Tests for CacheManager lookups by username, using a mocked client so that
+no request ever reaches Instagram.
+"""
+
+import os
+import sys
+from unittest import mock
+
+# Add the root directory (where instagram/ is located) to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from instagram.api.direct_messages import DirectMessages
+from instagram.cache import CacheManager
+
+
+def make_cache_manager() -> CacheManager:
+    """CacheManager with a mocked ClientWrapper and no config files touched."""
+    with mock.patch("instagram.cache.Config"):
+        return CacheManager(mock.MagicMock())
+
+
+def test_get_user_from_username_cache_hit():
+    """A cached username is returned without calling the API"""
+    cache = make_cache_manager()
+    user = mock.MagicMock(username="alice")
+    cache.username_user_cache["alice"] = user
+
+    result = cache.get_user_from_username("Alice")
+
+    assert result is user.model_copy.return_value
+    insta_client = cache.client.insta_client
+    insta_client.user_info_by_username_gql.assert_not_called()
+    insta_client.user_info_by_username_v1.assert_not_called()
+
+
+def test_get_user_from_username_cache_miss():
+    """An unknown username is fetched once and then served from the cache"""
+    cache = make_cache_manager()
+    insta_client = cache.client.insta_client
+    user = mock.MagicMock(username="bob")
+    insta_client.user_info_by_username_gql.return_value = user
+
+    first = cache.get_user_from_username("bob")
+    second = cache.get_user_from_username("bob")
+
+    insta_client.user_info_by_username_gql.assert_called_once_with("bob")
+    insta_client.user_info_by_username_v1.assert_not_called()
+    assert cache.username_user_cache["bob"] is user
+    assert first is user.model_copy.return_value
+    assert second is user.model_copy.return_value
+
+
+def test_search_by_username_uses_user_cache():
+    """DirectMessages resolves a cached username without a user info request"""
+    dm = DirectMessages(mock.MagicMock())
+    dm._users = make_cache_manager()
+    user = mock.MagicMock(username="alice", pk="42")
+    user.model_copy.return_value = user
+    dm._users.username_user_cache["alice"] = user
+    insta_client = dm.client.insta_client
+
+    with mock.patch("instagram.api.direct_messages.extract_direct_thread") as extract:
+        chat = dm.search_by_username("Alice")
+
+    insta_client.user_info_by_username_v1.assert_not_called()
+    insta_client.direct_thread_by_participants.assert_called_once_with(user_ids=["42"])
+    assert chat.thread_id == extract.return_value.id